@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-15 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='dataset',
+            options={'ordering': ['-uploaded_at'], 'verbose_name': 'Dataset', 'verbose_name_plural': 'Datasets'},
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='file',
+            field=models.FileField(help_text='The uploaded CSV file', upload_to='uploads/'),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='original_filename',
+            field=models.CharField(blank=True, help_text='Original filename of the uploaded file', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='preview_html',
+            field=models.TextField(blank=True, help_text='Optional HTML preview of the dataset'),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='summary',
+            field=models.JSONField(blank=True, help_text='Computed summary statistics (counts, averages, distributions)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='dataset',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, help_text='Timestamp when the file was uploaded'),
+        ),
+    ]
@@ -22,6 +22,7 @@ class Dataset(models.Model):
     
     uploaded_at = models.DateTimeField(
         auto_now_add=True,
+        db_index=True,
         help_text='Timestamp when the file was uploaded'
     )
     
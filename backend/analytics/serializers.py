@@ -21,3 +21,18 @@ class DatasetSerializer(serializers.ModelSerializer):
         model = Dataset
         fields = '__all__'
         read_only_fields = ['uploaded_at']
+
+
+class DatasetHistorySerializer(serializers.ModelSerializer):
+    """
+    Lightweight serializer for the upload history.
+    
+    Omits the stored file and HTML preview, which history listings
+    never display.
+    """
+    
+    class Meta:
+        """Metadata for the serializer."""
+        model = Dataset
+        fields = ['id', 'original_filename', 'uploaded_at', 'summary']
+        read_only_fields = fields
@@ -1,3 +1,344 @@
-from django.test import TestCase
+"""
+Tests for the Analytics application.
 
-# Create your tests here.
+Covers CSV uploads, old dataset cleanup, dataset previews and downloads,
+and the history, latest summary and refresh API endpoints.
+"""
+
+import shutil
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.test import TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Dataset
+from .views import CLEANUP_ATTEMPTS, MAX_DATASETS, UploadCSV, _CLEANUP_POOL
+
+
+SAMPLE_SUMMARY = {
+    'total_count': 3,
+    'averages': {'Flowrate': 100.0, 'Pressure': 5.0, 'Temperature': 110.0},
+    'type_distribution': {'Pump': 2, 'Valve': 1}
+}
+
+SAMPLE_CSV = settings.BASE_DIR.parent / 'sampledata' / 'sample_equipment_data.csv'
+
+CSV_HEADER = b'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+
+
+class TemporaryMediaMixin:
+    """Store files in a temporary MEDIA_ROOT that is removed after each test."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+
+class UploadCSVTests(TemporaryMediaMixin, APITestCase):
+    """Tests for the CSV upload endpoint."""
+
+    def setUp(self):
+        super().setUp()
+        # The cleanup worker thread cannot see the test transaction
+        cleanup_patch = mock.patch('analytics.views._CLEANUP_POOL')
+        self.cleanup_pool = cleanup_patch.start()
+        self.addCleanup(cleanup_patch.stop)
+
+    def upload(self, name, content):
+        return self.client.post(
+            '/api/upload/',
+            {'file': SimpleUploadedFile(name, content, content_type='text/csv')},
+            format='multipart'
+        )
+
+    def test_sample_summary_matches_pandas(self):
+        response = self.upload('sample.csv', SAMPLE_CSV.read_bytes())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.cleanup_pool.submit.assert_called_once()
+
+        dataframe = pd.read_csv(SAMPLE_CSV)
+        summary = response.data['summary']
+        self.assertEqual(summary['total_count'], len(dataframe))
+        for column, expected in dataframe[['Flowrate', 'Pressure', 'Temperature']].mean().items():
+            self.assertAlmostEqual(summary['averages'][column], expected, places=4)
+        self.assertEqual(summary['type_distribution'], dataframe['Type'].value_counts().to_dict())
+        self.assertEqual(Dataset.objects.get().summary, summary)
+
+    def test_empty_cells_are_skipped(self):
+        content = CSV_HEADER + (
+            b'Pump-1,Pump,10,,30\n'
+            b'Pump-2,,20,4,NA\n'
+            b'Valve-1,Valve,,6,50\n'
+        )
+        response = self.upload('empty_cells.csv', content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        summary = response.data['summary']
+        self.assertEqual(summary['total_count'], 3)
+        self.assertEqual(summary['averages'], {'Flowrate': 15.0, 'Pressure': 5.0, 'Temperature': 40.0})
+        self.assertEqual(summary['type_distribution'], {'Pump': 1, 'Valve': 1})
+
+    def test_blank_leading_lines_are_ignored(self):
+        response = self.upload('blank_lines.csv', b'\n\n' + CSV_HEADER + b'Pump-1,Pump,10,2,30\n')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['summary']['total_count'], 1)
+
+    def test_non_numeric_value_returns_400(self):
+        response = self.upload('bad_value.csv', CSV_HEADER + b'Pump-1,Pump,fast,2,30\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Invalid CSV format', response.data['error'])
+        self.assertFalse(Dataset.objects.exists())
+
+    def test_missing_column_returns_400(self):
+        response = self.upload('missing.csv', b'Equipment Name,Type,Flowrate,Pressure\nPump-1,Pump,10,2\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['missing'], ['Temperature'])
+        self.assertFalse(Dataset.objects.exists())
+
+
+class CleanupMixin(TemporaryMediaMixin):
+    """Helpers for datasets beyond the MAX_DATASETS limit."""
+
+    def create_datasets(self, count):
+        datasets = []
+        for index in range(count):
+            dataset = Dataset(original_filename=f'dataset{index}.csv')
+            dataset.file.save(f'dataset{index}.csv', ContentFile(CSV_HEADER))
+            datasets.append(dataset)
+        return datasets
+
+    def assert_only_recent_kept(self, datasets):
+        stale, recent = datasets[:-MAX_DATASETS], datasets[-MAX_DATASETS:]
+        self.assertEqual(
+            set(Dataset.objects.values_list('pk', flat=True)),
+            {dataset.pk for dataset in recent}
+        )
+        for dataset in stale:
+            self.assertFalse(dataset.file.storage.exists(dataset.file.name))
+        for dataset in recent:
+            self.assertTrue(dataset.file.storage.exists(dataset.file.name))
+
+
+class CleanupOldDatasetsTests(CleanupMixin, APITestCase):
+    """Tests for removing datasets beyond MAX_DATASETS."""
+
+    def test_removes_stale_rows_and_files(self):
+        datasets = self.create_datasets(MAX_DATASETS + 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UploadCSV()._cleanup_old_datasets()
+
+        self.assert_only_recent_kept(datasets)
+
+    def test_keeps_files_when_row_delete_fails(self):
+        datasets = self.create_datasets(MAX_DATASETS + 2)
+
+        with mock.patch('analytics.views.CLEANUP_RETRY_DELAY', 0), \
+                mock.patch('django.db.models.query.QuerySet.delete',
+                           side_effect=OperationalError('database is locked')) as delete, \
+                self.assertLogs('analytics.views', level='ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                UploadCSV()._cleanup_old_datasets()
+
+        self.assertEqual(delete.call_count, CLEANUP_ATTEMPTS)
+        self.assertEqual(Dataset.objects.count(), MAX_DATASETS + 2)
+        for dataset in datasets:
+            self.assertTrue(dataset.file.storage.exists(dataset.file.name))
+
+
+class BackgroundCleanupTests(CleanupMixin, TransactionTestCase):
+    """Tests for cleanup running on the background worker thread."""
+
+    def test_worker_removes_stale_rows_and_files(self):
+        datasets = self.create_datasets(MAX_DATASETS + 2)
+
+        _CLEANUP_POOL.submit(UploadCSV()._cleanup_old_datasets).result()
+
+        self.assert_only_recent_kept(datasets)
+
+
+class DatasetPreviewTests(TemporaryMediaMixin, APITestCase):
+    """Tests for the dataset preview endpoint."""
+
+    def create_dataset(self, content):
+        dataset = Dataset(original_filename='preview.csv')
+        dataset.file.save('preview.csv', ContentFile(content))
+        return dataset
+
+    def test_returns_preview_html(self):
+        dataset = self.create_dataset(CSV_HEADER + b'Pump-1,Pump,10,2,30\n')
+        response = self.client.get(f'/api/dataset/{dataset.pk}/preview/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Pump-1', response.data['preview_html'])
+
+    def test_missing_file_returns_404(self):
+        dataset = self.create_dataset(CSV_HEADER)
+        dataset.file.storage.delete(dataset.file.name)
+        response = self.client.get(f'/api/dataset/{dataset.pk}/preview/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn('error', response.data)
+
+    def test_undecodable_file_returns_400(self):
+        dataset = self.create_dataset(b'\xff\xfe\x00bad')
+        response = self.client.get(f'/api/dataset/{dataset.pk}/preview/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('error', response.data)
+
+
+class DatasetDownloadTests(TemporaryMediaMixin, APITestCase):
+    """Tests for the dataset download endpoint."""
+
+    def create_dataset(self, name, content=CSV_HEADER):
+        dataset = Dataset(original_filename=name)
+        dataset.file.save(name, ContentFile(content))
+        return dataset
+
+    def test_returns_file_attachment(self):
+        content = CSV_HEADER + b'Pump-1,Pump,10,2,30\n'
+        dataset = self.create_dataset('sample.csv', content)
+        response = self.client.get(f'/api/dataset/{dataset.pk}/download/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="sample.csv"')
+        self.assertEqual(b''.join(response.streaming_content), content)
+        response.close()
+
+    def test_missing_file_returns_404(self):
+        dataset = self.create_dataset('sample.csv')
+        dataset.file.storage.delete(dataset.file.name)
+        response = self.client.get(f'/api/dataset/{dataset.pk}/download/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn('error', response.data)
+
+    @override_settings(DATASET_ACCEL_REDIRECT_PREFIX='/protected_media/')
+    def test_accel_redirect_percent_encodes_path(self):
+        dataset = self.create_dataset('données.csv')
+        response = self.client.get(f'/api/dataset/{dataset.pk}/download/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected_media/uploads/donn%C3%A9es.csv'
+        )
+        self.assertEqual(
+            response['Content-Disposition'],
+            "attachment; filename*=utf-8''donn%C3%A9es.csv"
+        )
+
+
+class LatestSummaryTests(APITestCase):
+    """Tests for the latest summary endpoint."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_returns_404_without_datasets(self):
+        response = self.client.get('/api/summary/latest/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_matching_etag_returns_304(self):
+        Dataset.objects.create(
+            file='uploads/sample.csv',
+            summary=SAMPLE_SUMMARY,
+            original_filename='sample.csv'
+        )
+
+        response = self.client.get('/api/summary/latest/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        response = self.client.get(
+            '/api/summary/latest/',
+            HTTP_IF_NONE_MATCH=etag,
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Compression weakens the ETag; weak validators must still match
+        weak_etag = etag if etag.startswith('W/') else 'W/' + etag
+        response = self.client.get(
+            '/api/summary/latest/',
+            HTTP_IF_NONE_MATCH=weak_etag,
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_new_upload_changes_etag(self):
+        Dataset.objects.create(file='uploads/first.csv', summary=SAMPLE_SUMMARY)
+        etag = self.client.get('/api/summary/latest/')['ETag']
+
+        Dataset.objects.create(file='uploads/second.csv', summary=SAMPLE_SUMMARY)
+        response = self.client.get('/api/summary/latest/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class HistoryListTests(APITestCase):
+    """Tests for the history endpoint."""
+
+    def test_returns_paginated_history_fields(self):
+        Dataset.objects.create(
+            file='uploads/sample.csv',
+            summary=SAMPLE_SUMMARY,
+            original_filename='sample.csv',
+            preview_html='<table></table>'
+        )
+
+        response = self.client.get('/api/history/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+        item = response.data['results'][0]
+        self.assertEqual(item['original_filename'], 'sample.csv')
+        self.assertEqual(item['summary'], SAMPLE_SUMMARY)
+        self.assertNotIn('preview_html', item)
+        self.assertNotIn('file', item)
+
+
+class RefreshViewTests(APITestCase):
+    """Tests for the combined refresh endpoint."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_latest_is_null_without_datasets(self):
+        response = self.client.get('/api/refresh/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['latest'])
+        self.assertEqual(response.data['history']['count'], 0)
+        self.assertEqual(response.data['history']['results'], [])
+
+    def test_returns_latest_and_paginated_history(self):
+        for index in range(3):
+            Dataset.objects.create(
+                file=f'uploads/dataset{index}.csv',
+                summary=SAMPLE_SUMMARY,
+                original_filename=f'dataset{index}.csv'
+            )
+
+        response = self.client.get('/api/refresh/', {'limit': 1, 'offset': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        latest = response.data['latest']
+        self.assertEqual(latest['original_filename'], 'dataset2.csv')
+        self.assertEqual(latest['summary'], SAMPLE_SUMMARY)
+
+        history = response.data['history']
+        self.assertEqual(history['count'], 3)
+        self.assertIn('limit=1', history['next'])
+        self.assertIn('offset=2', history['next'])
+        self.assertEqual(
+            [item['original_filename'] for item in history['results']],
+            ['dataset1.csv']
+        )
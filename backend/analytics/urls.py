@@ -9,7 +9,9 @@ from .views import (
     UploadCSV,
     HistoryList,
     DatasetDownload,
-    LatestSummary
+    DatasetPreview,
+    LatestSummary,
+    RefreshView
 )
 
 app_name = 'analytics'
@@ -24,6 +26,12 @@ urlpatterns = [
     # Latest summary endpoint
     path('summary/latest/', LatestSummary.as_view(), name='latest_summary'),
     
+    # Combined latest summary and history endpoint
+    path('refresh/', RefreshView.as_view(), name='refresh'),
+    
+    # Preview endpoint
+    path('dataset/<int:pk>/preview/', DatasetPreview.as_view(), name='preview'),
+    
     # Download endpoint
     path('dataset/<int:pk>/download/', DatasetDownload.as_view(), name='download'),
 ]
@@ -5,29 +5,145 @@ This module handles CSV file uploads, data processing, and provides
 endpoints for retrieving summaries and download history.
 """
 
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import quote
+
+import numpy as np
 import pandas as pd
-from django.http import FileResponse
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.http import FileResponse, HttpResponse
+from django.views.decorators.gzip import gzip_page
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.utils.http import content_disposition_header
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.settings import api_settings
 
 from .models import Dataset
-from .serializers import DatasetSerializer
+from .serializers import DatasetSerializer, DatasetHistorySerializer
 
 
 # Required columns for CSV validation
-REQUIRED_COLUMNS = {
+REQUIRED_COLUMNS = frozenset({
     'Equipment Name',
     'Type',
     'Flowrate',
     'Pressure',
     'Temperature'
+})
+
+# Numeric columns averaged in the summary
+NUMERIC_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
+
+# Column types used when parsing uploaded CSV files
+CSV_COLUMN_TYPES = {
+    'Flowrate': pa.float32(),
+    'Pressure': pa.float32(),
+    'Temperature': pa.float32(),
+    'Type': pa.dictionary(pa.int32(), pa.string()),
+    'Equipment Name': pa.string()
 }
 
+# Number of bytes parsed per record batch when streaming a CSV file
+CSV_BLOCK_SIZE = 1 << 20
+
 # Maximum number of datasets to keep
 MAX_DATASETS = 5
 
+# Seconds to cache the latest summary payload
+LATEST_SUMMARY_CACHE_TIMEOUT = 60
+
+# Number of rows rendered in a dataset preview
+PREVIEW_ROWS = 10
+
+# Background worker that removes old datasets off the request path
+_CLEANUP_POOL = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix='dataset-cleanup'
+)
+
+# Attempts made when cleanup hits a locked database, and the base delay
+# in seconds between them
+CLEANUP_ATTEMPTS = 3
+CLEANUP_RETRY_DELAY = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+def _delete_files(files):
+    """
+    Delete stored files without touching their model instances.
+    
+    Args:
+        files: Iterable of FieldFile objects
+    """
+    for file in files:
+        file.delete(save=False)
+
+
+def _get_latest_summary():
+    """
+    Build the summary payload for the most recently uploaded dataset.
+    
+    Payloads are cached per dataset, so repeated polls only need the
+    indexed lookup of the latest dataset's key.
+    
+    Returns:
+        tuple: (etag, payload with summary, upload time and filename),
+            or (None, None) if no datasets exist
+    """
+    latest = Dataset.objects.order_by('-uploaded_at').values(
+        'pk', 'uploaded_at'
+    ).first()
+    if latest is None:
+        return None, None
+    
+    version = f"{latest['pk']}-{latest['uploaded_at'].timestamp()}"
+    cache_key = f'analytics:latest_summary:{version}'
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = Dataset.objects.filter(pk=latest['pk']).values(
+            'summary', 'uploaded_at', 'original_filename'
+        ).first()
+        if payload is None:
+            # Removed by a concurrent cleanup
+            return None, None
+        cache.set(cache_key, payload, LATEST_SUMMARY_CACHE_TIMEOUT)
+    
+    return f'"{version}"', payload
+
+
+def _get_history_response(request, view):
+    """
+    Build the paginated history response for a request.
+    
+    Args:
+        request: HTTP request carrying pagination parameters
+        view: View handling the request
+        
+    Returns:
+        Paginated response with the datasets' history fields
+    """
+    datasets = Dataset.objects.order_by('-uploaded_at').only(
+        *DatasetHistorySerializer.Meta.fields
+    )
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+    page = paginator.paginate_queryset(datasets, request, view=view)
+    serializer = DatasetHistorySerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
 
 class UploadCSV(APIView):
     """
@@ -59,29 +175,55 @@ class UploadCSV(APIView):
             )
         
         try:
-            # Read and validate CSV
-            dataframe = pd.read_csv(csv_file)
+            # Read only the header so invalid files skip the full parse
+            header = pd.read_csv(csv_file, nrows=0)
+            csv_file.seek(0)
             
             # Validate required columns
-            if not REQUIRED_COLUMNS.issubset(set(dataframe.columns)):
+            missing = REQUIRED_COLUMNS - set(header.columns)
+            if missing:
                 return Response({
                     'error': 'CSV missing required columns',
                     'required': list(REQUIRED_COLUMNS),
-                    'found': list(dataframe.columns)
+                    'missing': sorted(missing),
+                    'found': list(header.columns)
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Calculate summary statistics
-            summary = self._calculate_summary(dataframe)
-            
-            # Save dataset
-            dataset = Dataset.objects.create(
-                file=csv_file,
-                summary=summary,
-                original_filename=getattr(csv_file, 'name', 'uploaded.csv')
-            )
+            with transaction.atomic():
+                # Save dataset first so the upload is only written once
+                dataset = Dataset.objects.create(
+                    file=csv_file,
+                    original_filename=getattr(csv_file, 'name', 'uploaded.csv')
+                )
+                
+                try:
+                    # Stream only the required columns from the stored file
+                    with dataset.file.open('rb') as stored_file:
+                        batches = pacsv.open_csv(
+                            stored_file,
+                            read_options=pacsv.ReadOptions(
+                                use_threads=True,
+                                block_size=CSV_BLOCK_SIZE
+                            ),
+                            convert_options=pacsv.ConvertOptions(
+                                include_columns=list(REQUIRED_COLUMNS),
+                                column_types=CSV_COLUMN_TYPES,
+                                strings_can_be_null=True
+                            )
+                        )
+                        
+                        # Calculate summary statistics in a single pass
+                        summary = self._calculate_summary(batches)
+                except Exception:
+                    # The row is rolled back, but the stored file is not
+                    dataset.file.delete(save=False)
+                    raise
+                
+                dataset.summary = summary
+                dataset.save(update_fields=['summary'])
             
-            # Maintain only the most recent datasets
-            self._cleanup_old_datasets()
+            # Maintain only the most recent datasets in the background
+            _CLEANUP_POOL.submit(self._cleanup_old_datasets)
             
             # Return serialized response
             serializer = DatasetSerializer(dataset)
@@ -92,7 +234,7 @@ class UploadCSV(APIView):
                 {'error': 'CSV file is empty'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except pd.errors.ParserError as e:
+        except (pd.errors.ParserError, pa.ArrowInvalid) as e:
             return Response(
                 {'error': f'Invalid CSV format: {str(e)}'}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -103,24 +245,53 @@ class UploadCSV(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def _calculate_summary(self, dataframe):
+    def _calculate_summary(self, batches):
         """
-        Calculate summary statistics from the dataframe.
+        Calculate summary statistics from a stream of Arrow record batches.
+        
+        Running sums and counts are accumulated per batch so the whole
+        file never has to be held in memory at once.
         
         Args:
-            dataframe: pandas DataFrame containing the CSV data
+            batches: Iterable of pyarrow RecordBatches containing the CSV data
             
         Returns:
             dict: Summary statistics including total count, averages, and type distribution
         """
-        total_count = len(dataframe)
+        total_count = 0
+        sums = np.zeros(len(NUMERIC_COLUMNS), dtype=np.float64)
+        counts = np.zeros(len(NUMERIC_COLUMNS), dtype=np.int64)
+        type_counts = Counter()
+        
+        for batch in batches:
+            total_count += batch.num_rows
+            
+            # Accumulate sums and non-missing counts for numeric columns
+            # from one validity mask (missing values are read as NaN)
+            values = np.column_stack([
+                batch.column(name).to_numpy(zero_copy_only=False)
+                for name in NUMERIC_COLUMNS
+            ])
+            valid = ~np.isnan(values)
+            sums += np.where(valid, values, 0).sum(axis=0, dtype=np.float64)
+            counts += valid.sum(axis=0)
+            
+            # Accumulate type distribution from the dictionary codes
+            types = batch.column('Type')
+            codes = pc.drop_null(types.indices).to_numpy()
+            type_totals = np.bincount(codes, minlength=len(types.dictionary))
+            for key, value in zip(types.dictionary.to_pylist(), type_totals.tolist()):
+                if value:
+                    type_counts[key] += value
         
         # Calculate averages for numeric columns
-        numeric_columns = ['Flowrate', 'Pressure', 'Temperature']
-        averages = dataframe[numeric_columns].mean().to_dict()
+        averages = dict(zip(NUMERIC_COLUMNS, (sums / np.maximum(counts, 1)).tolist()))
         
-        # Calculate type distribution
-        type_distribution = dataframe['Type'].value_counts().to_dict()
+        # Calculate type distribution, most common first
+        type_distribution = {
+            str(key): int(value)
+            for key, value in type_counts.most_common()
+        }
         
         return {
             'total_count': int(total_count),
@@ -131,36 +302,134 @@ class UploadCSV(APIView):
     def _cleanup_old_datasets(self):
         """
         Remove old datasets, keeping only the most recent MAX_DATASETS.
+        
+        Runs on the cleanup worker thread, so errors are logged rather than
+        raised and the thread's database connection is closed afterwards.
+        Attempts that fail on a locked database are retried; each attempt
+        re-reads which datasets are stale.
         """
-        while Dataset.objects.count() > MAX_DATASETS:
-            oldest = Dataset.objects.earliest('uploaded_at')
-            # Delete associated file
-            if oldest.file:
-                oldest.file.delete(save=False)
-            oldest.delete()
+        try:
+            for attempt in range(1, CLEANUP_ATTEMPTS + 1):
+                try:
+                    self._delete_stale_datasets()
+                    return
+                except OperationalError:
+                    if attempt == CLEANUP_ATTEMPTS:
+                        raise
+                    time.sleep(CLEANUP_RETRY_DELAY * attempt)
+        except Exception:
+            logger.exception('Failed to clean up old datasets')
+        finally:
+            connection.close()
+    
+    def _delete_stale_datasets(self):
+        """
+        Delete datasets beyond the most recent MAX_DATASETS in one transaction.
+        """
+        with transaction.atomic():
+            keep_ids = list(
+                Dataset.objects.order_by('-uploaded_at')
+                .values_list('pk', flat=True)[:MAX_DATASETS]
+            )
+            stale = list(Dataset.objects.exclude(pk__in=keep_ids).only('file'))
+            if not stale:
+                return
+            
+            Dataset.objects.filter(pk__in=[dataset.pk for dataset in stale]).delete()
+            
+            # Delete associated files (bulk delete skips FileField cleanup)
+            # only once the row delete is committed, since file deletes
+            # cannot be rolled back
+            stale_files = [dataset.file for dataset in stale if dataset.file]
+            transaction.on_commit(partial(_delete_files, stale_files))
 
 
+@method_decorator(gzip_page, name='dispatch')
 class HistoryList(APIView):
     """
     Retrieve list of all uploaded datasets.
     
-    Returns datasets ordered by upload date (most recent first).
+    Returns datasets ordered by upload date (most recent first), paginated
+    and limited to the fields shown in the upload history.
     """
     
     def get(self, request, format=None):
         """
-        Get all datasets.
+        Get a page of datasets.
         
         Args:
             request: HTTP request
             format: Optional format parameter
             
         Returns:
-            Response with list of all datasets
+            Paginated response with the datasets' history fields
         """
-        datasets = Dataset.objects.all().order_by('-uploaded_at')
-        serializer = DatasetSerializer(datasets, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return _get_history_response(request, self)
+
+
+class DatasetPreview(APIView):
+    """
+    Render an HTML preview of a specific dataset.
+    
+    The preview is built on demand from the stored file rather than
+    persisted with every dataset.
+    """
+    
+    def get(self, request, pk, format=None):
+        """
+        Get HTML preview of the first rows of a dataset.
+        
+        Args:
+            request: HTTP request
+            pk: Primary key of the dataset
+            format: Optional format parameter
+            
+        Returns:
+            Response with the preview HTML, or error message if the dataset
+            or its file is missing or cannot be parsed
+        """
+        try:
+            dataset = Dataset.objects.only('file').get(pk=pk)
+        except Dataset.DoesNotExist:
+            return Response(
+                {'error': 'Dataset not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if not dataset.file:
+            return Response(
+                {'error': 'File not found for this dataset'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            with dataset.file.open('rb') as stored_file:
+                dataframe = pd.read_csv(stored_file, nrows=PREVIEW_ROWS)
+        except FileNotFoundError:
+            return Response(
+                {'error': 'File not found for this dataset'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except pd.errors.EmptyDataError:
+            return Response(
+                {'error': 'CSV file is empty'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except (pd.errors.ParserError, UnicodeDecodeError) as e:
+            return Response(
+                {'error': f'Invalid CSV format: {str(e)}'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            return Response(
+                {'error': f'Processing error: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        return Response({
+            'id': dataset.pk,
+            'preview_html': dataframe.to_html(index=False)
+        }, status=status.HTTP_200_OK)
 
 
 class DatasetDownload(APIView):
@@ -180,7 +449,9 @@ class DatasetDownload(APIView):
             format: Optional format parameter
             
         Returns:
-            FileResponse with the CSV file, or error message if not found
+            FileResponse with the CSV file (or an X-Accel-Redirect response
+            when DATASET_ACCEL_REDIRECT_PREFIX is set), or error message if
+            not found
         """
         try:
             dataset = Dataset.objects.get(pk=pk)
@@ -191,10 +462,29 @@ class DatasetDownload(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Return file as download
             filename = dataset.original_filename or 'dataset.csv'
+            
+            # Let the front web server send the file when configured
+            accel_prefix = getattr(settings, 'DATASET_ACCEL_REDIRECT_PREFIX', None)
+            if accel_prefix:
+                response = HttpResponse(content_type='text/csv')
+                response['X-Accel-Redirect'] = accel_prefix + quote(dataset.file.name)
+                response['Content-Disposition'] = content_disposition_header(
+                    as_attachment=True,
+                    filename=filename
+                )
+                return response
+            
+            # Return file as download from a real OS file so the server
+            # can use wsgi.file_wrapper / sendfile
+            try:
+                file_handle = open(dataset.file.path, 'rb')
+            except NotImplementedError:
+                # Storage without local paths
+                file_handle = dataset.file.open('rb')
+            
             return FileResponse(
-                dataset.file.open(), 
+                file_handle, 
                 as_attachment=True, 
                 filename=filename
             )
@@ -204,8 +494,14 @@ class DatasetDownload(APIView):
                 {'error': 'Dataset not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        except FileNotFoundError:
+            return Response(
+                {'error': 'File not found for this dataset'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
 
 
+@method_decorator(gzip_page, name='dispatch')
 class LatestSummary(APIView):
     """
     Retrieve the latest dataset summary.
@@ -222,19 +518,46 @@ class LatestSummary(APIView):
             format: Optional format parameter
             
         Returns:
-            Response with latest summary data, or error if no datasets exist
+            Response with latest summary data and its ETag, 304 if it
+            matches If-None-Match, or error if no datasets exist
         """
-        try:
-            latest_dataset = Dataset.objects.latest('uploaded_at')
-            
-            return Response({
-                'summary': latest_dataset.summary,
-                'uploaded_at': latest_dataset.uploaded_at,
-                'original_filename': latest_dataset.original_filename
-            }, status=status.HTTP_200_OK)
-            
-        except Dataset.DoesNotExist:
+        etag, payload = _get_latest_summary()
+        if payload is None:
             return Response(
                 {'error': 'No datasets found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        # Client already has this summary (weak comparison, so ETags
+        # weakened by compression still match)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(payload, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        return response
+
+
+@method_decorator(gzip_page, name='dispatch')
+class RefreshView(APIView):
+    """
+    Retrieve the latest summary and upload history together.
+    
+    Lets clients refresh both views with a single request.
+    """
+    
+    def get(self, request, format=None):
+        """
+        Get latest summary and a page of history.
+        
+        Args:
+            request: HTTP request
+            format: Optional format parameter
+            
+        Returns:
+            Response with the latest summary (or None if no datasets exist)
+            and the paginated history
+        """
+        return Response({
+            'latest': _get_latest_summary()[1],
+            'history': _get_history_response(request, self).data
+        }, status=status.HTTP_200_OK)
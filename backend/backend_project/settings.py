@@ -60,7 +60,9 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
-    'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.AllowAny',)
+    'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.AllowAny',),
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'PAGE_SIZE': 20
 }
 
 
@@ -91,12 +93,23 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent
+            # writers (e.g. the cleanup worker) wait for it instead of
+            # failing with "database is locked" on lock upgrade
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR/ 'media'
 
+# Internal nginx location mapped to MEDIA_ROOT (e.g. '/protected_media/', see
+# DOCUMENTATION.md). When set, dataset downloads are handed to nginx via
+# X-Accel-Redirect instead of streamed by Django.
+DATASET_ACCEL_REDIRECT_PREFIX = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -6,28 +6,48 @@ Provides functions for uploading files, retrieving summaries, and history.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
 import os
 
 # Backend API base URL
 BASE = 'http://localhost:8000/api/'
 
+# Shared session so connections are kept alive between requests
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
 def upload_csv(filepath, auth=None):
     """Upload a CSV file to the backend"""
     filename = os.path.basename(filepath)
     with open(filepath, 'rb') as f:
-        files = {'file': (filename, f, 'text/csv')}
-        resp = requests.post(BASE + 'upload/', files=files, auth=auth)
+        # Stream the multipart body instead of building it in memory
+        encoder = MultipartEncoder(fields={'file': (filename, f, 'text/csv')})
+        resp = _SESSION.post(
+            BASE + 'upload/',
+            data=encoder,
+            headers={'Content-Type': encoder.content_type},
+            auth=auth
+        )
         resp.raise_for_status()
     return resp.json()
 
 def get_latest_summary(auth=None):
     """Get the latest dataset summary"""
-    resp = requests.get(BASE + 'summary/latest/', auth=auth)
+    resp = _SESSION.get(BASE + 'summary/latest/', auth=auth)
     resp.raise_for_status()
     return resp.json()
 
 def get_history(auth=None):
-    """Get upload history"""
-    resp = requests.get(BASE + 'history/', auth=auth)
+    """Get upload history (first page of results)"""
+    resp = _SESSION.get(BASE + 'history/', auth=auth)
+    resp.raise_for_status()
+    return resp.json()['results']
+
+def get_refresh(auth=None):
+    """Get the latest summary and upload history in one request"""
+    resp = _SESSION.get(BASE + 'refresh/', auth=auth)
     resp.raise_for_status()
     return resp.json()
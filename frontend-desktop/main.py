@@ -11,11 +11,13 @@ Requires:
 - PyQt5
 - matplotlib
 - requests
+- requests-toolbelt
 - Backend API running on http://localhost:8000
 """
 
 import sys
 import requests
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
     QPushButton, QFileDialog, QLabel, 
@@ -25,10 +27,46 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import api
 
+# Chart cache key used while the empty placeholder is shown
+EMPTY_PLOT_KEY = object()
+
+class UploadWorker(QObject):
+    """Uploads a CSV file off the UI thread"""
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(object)
+    
+    def __init__(self, path, auth=None):
+        super().__init__()
+        self.path = path
+        self.auth = auth
+        
+    def run(self):
+        try:
+            self.finished.emit(api.upload_csv(self.path, auth=self.auth))
+        except Exception as e:
+            self.error.emit(e)
+
+class RefreshWorker(QObject):
+    """Fetches the latest summary and history off the UI thread"""
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(object)
+    
+    def __init__(self, auth=None):
+        super().__init__()
+        self.auth = auth
+        
+    def run(self):
+        try:
+            self.finished.emit(api.get_refresh(auth=self.auth))
+        except Exception as e:
+            self.error.emit(e)
+
 class App(QWidget):
     def __init__(self):
         super().__init__()
         self.auth = None  # tuple (user, pass) if using basic auth
+        self._workers = []  # (thread, worker) pairs still running
+        self._last_plot_key = None  # data shown in the chart, to skip redraws
         self.initUI()
         self.refresh_data()
         
@@ -126,6 +164,35 @@ class App(QWidget):
         main_layout.addWidget(self.tabs)
         self.setLayout(main_layout)
         
+    def set_busy(self, busy):
+        """Enable or disable both actions while a request is in flight"""
+        # Workers share api's requests session, so only one may run at a time
+        self.upload_btn.setEnabled(not busy)
+        self.refresh_btn.setEnabled(not busy)
+        
+    def closeEvent(self, event):
+        """Wait for running requests so no thread is destroyed while running"""
+        for thread, _ in list(self._workers):
+            thread.quit()
+            thread.wait()
+        super().closeEvent(event)
+        
+    def start_worker(self, worker, on_finished, on_error):
+        """Run a worker on its own thread and route its signals back to the UI"""
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.finished.connect(on_finished)
+        worker.error.connect(on_error)
+        worker.finished.connect(thread.quit)
+        worker.error.connect(thread.quit)
+        thread.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        # Keep references until the thread is done
+        self._workers.append((thread, worker))
+        thread.finished.connect(lambda: self._workers.remove((thread, worker)))
+        thread.start()
+        
     def upload(self):
         """Handle CSV file upload"""
         path, _ = QFileDialog.getOpenFileName(
@@ -136,55 +203,66 @@ class App(QWidget):
             
         self.msg.setText('Uploading...')
         self.msg.setStyleSheet("padding: 5px; color: #2196F3;")
-        self.upload_btn.setEnabled(False)
+        self.set_busy(True)
         
-        try:
-            res = api.upload_csv(path, auth=self.auth)
-            self.msg.setText(f'✓ Uploaded successfully: {res.get("original_filename", "file")}')
-            self.msg.setStyleSheet("padding: 5px; color: #4CAF50; font-weight: bold;")
-            # Refresh data after upload
-            self.refresh_data()
-        except requests.exceptions.RequestException as e:
-            error_msg = str(e)
+        worker = UploadWorker(path, auth=self.auth)
+        self.start_worker(worker, self.on_upload_finished, self.on_upload_error)
+        
+    def on_upload_finished(self, res):
+        """Show upload success and refresh data"""
+        self.msg.setText(f'✓ Uploaded successfully: {res.get("original_filename", "file")}')
+        self.msg.setStyleSheet("padding: 5px; color: #4CAF50; font-weight: bold;")
+        self.set_busy(False)
+        # Refresh data after upload
+        self.refresh_data()
+        
+    def on_upload_error(self, e):
+        """Show upload error"""
+        error_msg = str(e)
+        if isinstance(e, requests.exceptions.RequestException):
             if hasattr(e, 'response') and e.response is not None:
                 try:
                     error_data = e.response.json()
                     error_msg = error_data.get('error', str(e))
                 except:
                     error_msg = e.response.text or str(e)
-            self.msg.setText(f'✗ Error: {error_msg}')
-            self.msg.setStyleSheet("padding: 5px; color: #f44336; font-weight: bold;")
-        except Exception as e:
-            self.msg.setText(f'✗ Error: {str(e)}')
-            self.msg.setStyleSheet("padding: 5px; color: #f44336; font-weight: bold;")
-        finally:
-            self.upload_btn.setEnabled(True)
+        self.msg.setText(f'✗ Error: {error_msg}')
+        self.msg.setStyleSheet("padding: 5px; color: #f44336; font-weight: bold;")
+        self.set_busy(False)
             
     def refresh_data(self):
         """Refresh summary and history data"""
+        self.set_busy(True)
+        worker = RefreshWorker(auth=self.auth)
+        self.start_worker(worker, self.on_refresh_finished, self.on_refresh_error)
+        
+    def on_refresh_finished(self, data):
+        """Update summary and history from refreshed data"""
+        self.set_busy(False)
         try:
-            # Get latest summary
-            summary_data = api.get_latest_summary(auth=self.auth)
-            self.update_summary(summary_data)
+            summary_data = data.get('latest')
+            if summary_data is None:
+                # No data yet, that's okay
+                self.stats_label.setText('No data available. Upload a CSV file to get started.')
+                self.plot_empty()
+            else:
+                self.update_summary(summary_data)
             
-            # Get history
-            history_data = api.get_history(auth=self.auth)
-            self.update_history(history_data)
+            self.update_history(data.get('history', {}).get('results', []))
             
-        except requests.exceptions.RequestException as e:
-            if hasattr(e, 'response') and e.response is not None:
-                if e.response.status_code == 404:
-                    # No data yet, that's okay
-                    self.stats_label.setText('No data available. Upload a CSV file to get started.')
-                    self.plot_empty()
-                    self.history_table.setRowCount(0)
-                    return
-            self.msg.setText(f'Error refreshing: {str(e)}')
-            self.msg.setStyleSheet("padding: 5px; color: #f44336;")
         except Exception as e:
             self.msg.setText(f'Error: {str(e)}')
             self.msg.setStyleSheet("padding: 5px; color: #f44336;")
             
+    def on_refresh_error(self, e):
+        """Show refresh error"""
+        self.set_busy(False)
+        if isinstance(e, requests.exceptions.RequestException):
+            self.msg.setText(f'Error refreshing: {str(e)}')
+        else:
+            self.msg.setText(f'Error: {str(e)}')
+        self.msg.setStyleSheet("padding: 5px; color: #f44336;")
+            
     def update_summary(self, summary_data):
         """Update the summary display"""
         summary = summary_data.get('summary', {})
@@ -215,6 +293,11 @@ class App(QWidget):
             
     def plot_summary(self, type_distribution):
         """Plot the type distribution chart"""
+        key = tuple(sorted(type_distribution.items()))
+        if key == self._last_plot_key:
+            return
+        self._last_plot_key = key
+        
         self.fig.clear()
         ax = self.fig.add_subplot(111)
         
@@ -239,6 +322,10 @@ class App(QWidget):
         
     def plot_empty(self):
         """Show empty chart"""
+        if self._last_plot_key == EMPTY_PLOT_KEY:
+            return
+        self._last_plot_key = EMPTY_PLOT_KEY
+        
         self.fig.clear()
         ax = self.fig.add_subplot(111)
         ax.text(0.5, 0.5, 'No data to display', 
@@ -249,16 +336,28 @@ class App(QWidget):
         
     def update_history(self, history_data):
         """Update the history table"""
-        self.history_table.setRowCount(len(history_data))
+        table = self.history_table
         
-        for row, item in enumerate(history_data):
-            filename = item.get('original_filename', 'Unknown')
-            uploaded_at = item.get('uploaded_at', 'N/A')
-            total_count = item.get('summary', {}).get('total_count', 0) if item.get('summary') else 0
+        # Batch all cell writes into a single repaint
+        sorting_enabled = table.isSortingEnabled()
+        table.setSortingEnabled(False)
+        table.setUpdatesEnabled(False)
+        table.blockSignals(True)
+        try:
+            table.setRowCount(len(history_data))
             
-            self.history_table.setItem(row, 0, QTableWidgetItem(str(filename)))
-            self.history_table.setItem(row, 1, QTableWidgetItem(str(uploaded_at)))
-            self.history_table.setItem(row, 2, QTableWidgetItem(str(total_count)))
+            for row, item in enumerate(history_data):
+                filename = item.get('original_filename', 'Unknown')
+                uploaded_at = item.get('uploaded_at', 'N/A')
+                total_count = item.get('summary', {}).get('total_count', 0) if item.get('summary') else 0
+                
+                table.setItem(row, 0, QTableWidgetItem(str(filename)))
+                table.setItem(row, 1, QTableWidgetItem(str(uploaded_at)))
+                table.setItem(row, 2, QTableWidgetItem(str(total_count)))
+        finally:
+            table.blockSignals(False)
+            table.setUpdatesEnabled(True)
+            table.setSortingEnabled(sorting_enabled)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -40,7 +40,7 @@ function App() {
   const fetchHistory = async () => {
     try {
       const response = await api.get('history/');
-      setHistory(response.data);
+      setHistory(response.data.results);
     } catch (err) {
       console.error('Failed to fetch history:', err);
     }